@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import altair as alt
+import hashlib
 import io
 
 # ---------------- PAGE CONFIG ----------------
@@ -15,6 +16,13 @@ st.set_page_config(
 st.markdown(
     """
     <style>
+        .kpi-row {
+            display: flex;
+            gap: 1rem;
+        }
+        .kpi-row > div {
+            flex: 1;
+        }
         .kpi-title {
             font-size: 14px;
             color: gray;
@@ -28,30 +36,73 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+KPI_TEMPLATE = (
+    "<div>"
+    "<div class='kpi-title'>{title}</div>"
+    "<div class='kpi-value'>{value}</div>"
+    "</div>"
+)
+
+# ---------------- CHART STYLE ----------------
+SALES_AXIS = alt.Axis(format="$,.0f")
+FLOATING_SCALE = alt.Scale(zero=False)
+AXIS_STYLE = {"gridDash": [4, 4], "gridOpacity": 0.3}
+
 st.title("Walmart Demand Forecasting")
 
 # ---------------- DATA ----------------
-@st.cache_data
+@st.cache_resource
+def parse_history(digest, _raw):
+    # Trim padded header names up front; the pyarrow engine matches
+    # usecols/parse_dates/dtype on exact names and has no skipinitialspace.
+    header, sep, body = _raw.partition(b"\n")
+    header = b",".join(name.strip() for name in header.split(b","))
+
+    df = pd.read_csv(
+        io.BytesIO(header + sep + body),
+        engine="pyarrow",
+        usecols=["Store", "Date", "Weekly_Sales"],
+        parse_dates=["Date"],
+        date_format="%d-%m-%Y",
+        dtype={"Store": "int16", "Weekly_Sales": "float32"},
+    )
+    if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        raise ValueError("Date column does not match the DD-MM-YYYY format")
+
+    df = df.sort_values(["Store", "Date"], kind="mergesort", ignore_index=True)
+
+    groups = df.groupby("Store", sort=False)
+    recent_index = {store: group.iloc[-20:].copy() for store, group in groups}
+    # Average in float64 so the KPI matches the full-precision mean
+    store_means = (
+        df["Weekly_Sales"].astype("float64")
+        .groupby(df["Store"], sort=False).mean().to_dict()
+    )
+    return recent_index, store_means
+
 def load_data():
     if "csv_data" not in st.secrets:
         st.error("❌ csv_data missing in Streamlit Secrets")
         st.stop()
 
-    df = pd.read_csv(io.StringIO(st.secrets["csv_data"]))
-    df.columns = df.columns.str.strip()
-    df["Date"] = pd.to_datetime(df["Date"], dayfirst=True)
-    return df
+    raw = st.secrets["csv_data"].encode()
+    digest = hashlib.blake2b(raw, digest_size=8).hexdigest()
+    try:
+        return parse_history(digest, raw)
+    except ValueError as exc:
+        st.error(f"❌ Could not parse csv_data: {exc}")
+        st.stop()
 
-df = load_data()
+recent_index, store_means = load_data()
 
 # ---------------- SIDEBAR ----------------
 st.sidebar.header("Input Parameters")
 
 store_id = st.sidebar.number_input(
     "Store",
-    min_value=int(df["Store"].min()),
-    max_value=int(df["Store"].max()),
-    value=int(df["Store"].min())
+    min_value=int(min(recent_index)),
+    max_value=int(max(recent_index)),
+    value=int(min(recent_index))
 )
 
 holiday_flag = st.sidebar.toggle("Holiday Week")
@@ -61,8 +112,11 @@ cpi = st.sidebar.slider("CPI", 200.0, 300.0, 220.0)
 unemployment = st.sidebar.slider("Unemployment Rate (%)", 3.0, 15.0, 7.0)
 
 # ---------------- MODEL ----------------
-store_df = df[df["Store"] == store_id].sort_values("Date")
-avg_sales = store_df["Weekly_Sales"].mean()
+if store_id not in store_means:
+    st.warning(f"No sales history for store {store_id}")
+    st.stop()
+
+avg_sales = store_means[store_id]
 
 CONST = avg_sales
 COEF_HOLIDAY = 6634.0369
@@ -72,122 +126,141 @@ COEF_UNEMP = -418.9919
 TEMP_OPTIMAL = 70.0
 TEMP_CURVATURE = -196.8391
 
+holiday_term = COEF_HOLIDAY if holiday_flag else 0.0
+
 def temp_effect(t):
-    return TEMP_CURVATURE * (t - TEMP_OPTIMAL) ** 2
+    dt = t - TEMP_OPTIMAL
+    return TEMP_CURVATURE * dt * dt
 
 def base_prediction():
     return (
         CONST
-        + COEF_HOLIDAY * int(holiday_flag)
+        + holiday_term
         + COEF_FUEL * fuel_price
         + COEF_CPI * cpi
         + COEF_UNEMP * unemployment
     )
 
-predicted_sales = base_prediction() + temp_effect(temperature)
+base_sales = base_prediction()
+predicted_sales = base_sales + temp_effect(temperature)
 
 # ---------------- KPI SECTION ----------------
-k1, k2, k3 = st.columns(3)
-
-with k1:
-    st.markdown(
-        f"<div class='kpi-title'>Predicted Weekly Sales</div>"
-        f"<div class='kpi-value'>${predicted_sales:,.0f}</div>",
-        unsafe_allow_html=True
-    )
-
-with k2:
-    st.markdown(
-        f"<div class='kpi-title'>Average Store Sales</div>"
-        f"<div class='kpi-value'>${avg_sales:,.0f}</div>",
-        unsafe_allow_html=True
-    )
+delta = ((predicted_sales - avg_sales) / avg_sales) * 100
+kpis = (
+    ("Predicted Weekly Sales", f"${predicted_sales:,.0f}"),
+    ("Average Store Sales", f"${avg_sales:,.0f}"),
+    ("Change vs Average", f"{delta:.2f}%"),
+)
 
-with k3:
-    delta = ((predicted_sales - avg_sales) / avg_sales) * 100
-    st.markdown(
-        f"<div class='kpi-title'>Change vs Average</div>"
-        f"<div class='kpi-value'>{delta:.2f}%</div>",
-        unsafe_allow_html=True
-    )
+st.markdown(
+    "<div class='kpi-row'>"
+    + "".join(KPI_TEMPLATE.format(title=t, value=v) for t, v in kpis)
+    + "</div>",
+    unsafe_allow_html=True
+)
 
 # ---------------- TREND ----------------
 st.subheader("Recent Sales Trend")
 
-recent = store_df.tail(20)
+@st.cache_resource
+def trend_template():
+    trend = alt.Chart().mark_line(point=True, strokeWidth=2).encode(
+        x=alt.X("Date:T", title=None),
+        y=alt.Y(
+            "Weekly_Sales:Q", title=None, axis=SALES_AXIS, scale=FLOATING_SCALE
+        )
+    )
+    prediction = alt.Chart().mark_rule(
+        strokeDash=[6, 4], strokeWidth=1.5
+    ).encode(
+        y="Prediction:Q",
+        tooltip=alt.Tooltip("Prediction:Q", format="$,.0f")
+    )
+    label = alt.Chart().mark_text(
+        text="Prediction", align="left", baseline="bottom", dx=4, dy=-4
+    ).encode(x=alt.value(0), y="Prediction:Q")
+    return trend, prediction, label
 
-fig, ax = plt.subplots(figsize=(12, 4))
-ax.plot(recent["Date"], recent["Weekly_Sales"], marker="o", linewidth=2)
-ax.axhline(predicted_sales, linestyle="--", linewidth=1.5, label="Prediction")
-ax.legend(frameon=False)
-ax.grid(alpha=0.3, linestyle="--")
-ax.yaxis.set_major_formatter('${x:,.0f}')
-st.pyplot(fig, use_container_width=True)
+trend, prediction, label = trend_template()
+predicted = pd.DataFrame({"Prediction": [predicted_sales]})
+st.altair_chart(
+    alt.layer(
+        trend.properties(data=recent_index[store_id]),
+        prediction.properties(data=predicted),
+        label.properties(data=predicted)
+    ).configure_axis(**AXIS_STYLE),
+    use_container_width=True
+)
 
 # ---------------- SENSITIVITY ----------------
 st.subheader("Sensitivity Analysis")
 st.caption("Sales response around the current operating point")
 
-def plot_sensitivity(x, y, current_x, current_y, title, xlabel):
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.plot(x, y, linewidth=2.5)
-    ax.scatter(current_x, current_y, s=80, zorder=5)
-    ax.axvline(current_x, linestyle="--", linewidth=1.2)
-    ax.set_title(title)
-    ax.set_xlabel(xlabel)
-    ax.set_ylabel("Weekly Sales")
-    ax.grid(alpha=0.3, linestyle="--")
-    ax.yaxis.set_major_formatter('${x:,.0f}')
-    return fig
-
-c1, c2 = st.columns(2)
-
-# Temperature
-t_range = np.linspace(20, 120, 100)
-t_sales = base_prediction() + temp_effect(t_range)
-with c1:
-    st.pyplot(
-        plot_sensitivity(
-            t_range, t_sales, temperature, predicted_sales,
-            "Temperature Sensitivity", "Temperature (°F)"
-        ),
-        use_container_width=True
+@st.cache_resource
+def sensitivity_template(xlabel):
+    x_enc = alt.X("x:Q", title=xlabel, scale=FLOATING_SCALE)
+    y_enc = alt.Y(
+        "y:Q", title="Weekly Sales", axis=SALES_AXIS, scale=FLOATING_SCALE
     )
 
-# Fuel
-f_range = np.linspace(2, 5, 100)
-f_sales = predicted_sales + COEF_FUEL * (f_range - fuel_price)
-with c2:
-    st.pyplot(
-        plot_sensitivity(
-            f_range, f_sales, fuel_price, predicted_sales,
-            "Fuel Price Sensitivity", "Fuel ($/gal)"
-        ),
-        use_container_width=True
-    )
+    line = alt.Chart().mark_line(strokeWidth=2.5).encode(x=x_enc, y=y_enc)
+    rule = alt.Chart().mark_rule(strokeDash=[4, 4]).encode(x="x:Q")
+    point = alt.Chart().mark_point(size=80, filled=True).encode(x=x_enc, y=y_enc)
+    return line, rule, point
+
+def sensitivity_chart(x, y, current_x, current_y, title, xlabel):
+    line, rule, point = sensitivity_template(xlabel)
+    curve = pd.DataFrame({"x": x, "y": y})
+    current = pd.DataFrame({"x": [current_x], "y": [current_y]})
+
+    return alt.layer(
+        line.properties(data=curve),
+        rule.properties(data=current),
+        point.properties(data=current)
+    ).properties(title=title, width=260, height=200)
+
+@st.cache_resource
+def sweep_grids():
+    t_range = np.linspace(20, 120, 30, dtype=np.float32)
+    linear_ranges = np.array([[2, 5], [200, 300], [3, 15]], dtype=np.float32)
+    t_range.flags.writeable = False
+    linear_ranges.flags.writeable = False
+    return t_range, linear_ranges
 
-# CPI
-c_range = np.linspace(200, 300, 100)
-c_sales = predicted_sales + COEF_CPI * (c_range - cpi)
-with c1:
-    st.pyplot(
-        plot_sensitivity(
-            c_range, c_sales, cpi, predicted_sales,
-            "CPI Sensitivity", "CPI"
-        ),
-        use_container_width=True
+def sensitivity_grid():
+    t_range, linear_ranges = sweep_grids()
+
+    # Temperature
+    t_sales = base_sales + temp_effect(t_range)
+    t_chart = sensitivity_chart(
+        t_range, t_sales, temperature, predicted_sales,
+        "Temperature Sensitivity", "Temperature (°F)"
     )
 
-# Unemployment
-u_range = np.linspace(3, 15, 100)
-u_sales = predicted_sales + COEF_UNEMP * (u_range - unemployment)
-with c2:
-    st.pyplot(
-        plot_sensitivity(
-            u_range, u_sales, unemployment, predicted_sales,
-            "Unemployment Sensitivity", "Unemployment (%)"
-        ),
-        use_container_width=True
+    # Fuel, CPI, Unemployment: linear terms, swept together as rows of one grid
+    linear_current = (fuel_price, cpi, unemployment)
+    linear_coefs = np.array([[COEF_FUEL], [COEF_CPI], [COEF_UNEMP]], dtype=np.float32)
+    linear_sales = predicted_sales + linear_coefs * (
+        linear_ranges - np.array(linear_current, dtype=np.float32)[:, None]
+    )
+    f_chart, c_chart, u_chart = (
+        sensitivity_chart(x, y, current_x, predicted_sales, title, xlabel)
+        for x, y, current_x, title, xlabel in zip(
+            linear_ranges, linear_sales, linear_current,
+            ("Fuel Price Sensitivity", "CPI Sensitivity", "Unemployment Sensitivity"),
+            ("Fuel ($/gal)", "CPI", "Unemployment (%)")
+        )
     )
 
+    return alt.vconcat(
+        alt.hconcat(t_chart, f_chart),
+        alt.hconcat(c_chart, u_chart)
+    ).configure_axis(**AXIS_STYLE)
+
+sens_key = (avg_sales, holiday_flag, temperature, fuel_price, cpi, unemployment)
+if st.session_state.get("sens_key") != sens_key:
+    st.session_state["sens_key"] = sens_key
+    st.session_state["sens_chart"] = sensitivity_grid()
+st.altair_chart(st.session_state["sens_chart"])
+
 st.caption("Walmart Demand Forecasting")
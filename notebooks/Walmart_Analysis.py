@@ -25,7 +25,7 @@ if file_path:
     df = pd.read_csv(file_path)
 
     # --- Feature Engineering ---
-    df['Date'] = pd.to_datetime(df['Date'], dayfirst=True)
+    df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y')
     df = df.sort_values(['Store', 'Date'])
 
     df['Month'] = df['Date'].dt.month